@@ -1,17 +1,14 @@
+from startup_probe_app import mark
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import threading
-from shared_utils_app import get_gemini_client
-from query_app import ask_my_notes
 import os
 import json
-import markdown2
-import fitz 
-from loader_app import process_files_to_db
 import re
+import uuid
 from tkinter import Toplevel
-from PIL import Image, ImageTk
-import pyperclip
+# Heavy modules (Gemini/ChromaDB, OCR, PIL, clipboard) are imported inside the
+# methods that use them so the window can paint before they load.
 
 
 ctk.set_appearance_mode("Dark")
@@ -94,11 +91,16 @@ class StudyApp(ctk.CTk):
         self.chat_input.grid(row=1, column=0, padx=10, pady=10, sticky="ew")
         self.chat_input.bind("<Return>", lambda e: self.send_message())
         
-        # Chat history will be stored as a list of dicts with 'role' and 'content' for better session management
-        self.chat_history = [] # This will store our session memory
+        # The conversation's memory lives in its chat session (session_app), keyed by this id
+        self.conversation_id = str(uuid.uuid4()) # One reusable chat session per conversation
+        
+        # Optional cross-encoder rerank stage (configured via config_app.json)
+        self.rerank_settings = {"rerank": False, "rerank_candidates": 20, "rerank_threads": None, "rerank_budget": None}
         
         self.load_settings()
         
+        # Network and DB work waits until the window has painted
+        self.after(100, self.start_background_warmup)
         
 
     # --- Methods ---
@@ -111,6 +113,28 @@ class StudyApp(ctk.CTk):
             self.path_display.configure(state="disabled")
             self.save_settings()
 
+    def start_background_warmup(self):
+        mark("First paint")
+        if self.api_entry.get().strip():
+            # Automatically trigger a connection check
+            self.start_model_fetch()
+        threading.Thread(target=self.warmup_task, args=(self.api_entry.get().strip(), self.path_display.get()), daemon=True).start()
+
+    def warmup_task(self, api_key, db_path):
+        """Loads the RAG stack and opens the DB in the background so the first question is fast."""
+        try:
+            from query_app import ask_my_notes
+            from shared_utils_app import get_gemini_client, open_existing_collection
+            mark("RAG modules loaded")
+            if self.rerank_settings["rerank"]:
+                from rerank_app import warm_cross_encoder
+                warm_cross_encoder(num_threads=self.rerank_settings["rerank_threads"])
+            if api_key and db_path and "No DB" not in db_path:
+                if open_existing_collection(get_gemini_client(api_key), db_path, "university_notes"):
+                    mark("Database warmed")
+        except Exception as e:
+            print(f"Warm-up skipped: {e}")
+
     def start_model_fetch(self):
         key = self.api_entry.get().strip()
         self.api_status.configure(text="Connecting...", text_color="white")
@@ -118,6 +142,7 @@ class StudyApp(ctk.CTk):
 
     def fetch_models_task(self, api_key):
         try:
+            from shared_utils_app import get_gemini_client
             client = get_gemini_client(api_key)
             models = [m.name.replace("models/", "") for m in client.models.list() if 'generateContent' in m.supported_actions]
             self.after(0, lambda: self.update_model_menu(models))
@@ -142,18 +167,10 @@ class StudyApp(ctk.CTk):
 
     def ai_worker_task(self, query, key, path, model):
         try:
-            # 1. Ask the AI (using your updated query_app.py)
-            answer = ask_my_notes(query, key, path, model, history=self.chat_history)
-            
-            # 2. FIX: Append using the correct dictionary structure
-            self.chat_history.append({
-                "role": "user", 
-                "parts": [{"text": query}] # Must be a list of dictionaries
-            })
-            self.chat_history.append({
-                "role": "model", 
-                "parts": [{"text": answer}] # Must be a list of dictionaries
-            })
+            from query_app import ask_my_notes
+            # Ask the AI; the conversation's chat session keeps (and bounds) its own history
+            answer = ask_my_notes(query, key, path, model,
+                                  conversation_id=self.conversation_id, **self.rerank_settings)
             
             self.after(0, lambda: self.add_message("Assistant", answer))
         except Exception as e:
@@ -164,8 +181,9 @@ class StudyApp(ctk.CTk):
         """Opens file dialog with expanded types for Vision support."""
         files = filedialog.askopenfilenames(
             filetypes=[
-                ("All Supported Docs", "*.pdf *.pptx *.txt *.jpg *.png *.jpeg"),
+                ("All Supported Docs", "*.pdf *.pptx *.txt *.srt *.vtt *.json *.jpg *.png *.jpeg"),
                 ("Documents", "*.pdf *.pptx *.txt"), 
+                ("Transcripts", "*.srt *.vtt *.json *.jsonl"),
                 ("Images", "*.jpg *.png *.jpeg")
             ]
         )
@@ -208,6 +226,7 @@ class StudyApp(ctk.CTk):
 
     def open_file_manager(self):
         from loader_app import get_unique_sources
+        from shared_utils_app import get_gemini_client
         manager = ctk.CTkToplevel(self)
         manager.title("File Manager")
         manager.geometry("400x500")
@@ -228,6 +247,7 @@ class StudyApp(ctk.CTk):
     def delete_file_action(self, filename, window):
         if messagebox.askyesno("Confirm", f"Delete {filename}?"):
             from loader_app import delete_source_from_db
+            from shared_utils_app import get_gemini_client
             client = get_gemini_client(self.api_entry.get())
             delete_source_from_db(client, self.path_display.get(), filename)
             window.destroy()
@@ -241,7 +261,6 @@ class StudyApp(ctk.CTk):
             import time
 
             # 1. Force release of DB handles
-            self.chat_history = []
             # If you have a reference to the collection/client in your class:
             if hasattr(self, 'current_collection'):
                 self.current_collection = None
@@ -277,7 +296,8 @@ class StudyApp(ctk.CTk):
         config = {
             "api_key": self.api_entry.get(),
             "db_path": self.path_display.get(),
-            "last_model": self.model_menu.get()
+            "last_model": self.model_menu.get(),
+            **self.rerank_settings
         }
         with open("config_app.json", "w") as f:
             json.dump(config, f)
@@ -294,8 +314,9 @@ class StudyApp(ctk.CTk):
                 self.path_display.configure(state="disabled")
                 if "last_model" in config:
                     self.model_menu.set(config["last_model"])
-                # Automatically trigger a connection check
-                self.start_model_fetch()
+                for k in self.rerank_settings:
+                    if k in config:
+                        self.rerank_settings[k] = config[k]
         except FileNotFoundError:
             pass # First time running the app
         
@@ -369,6 +390,7 @@ class StudyApp(ctk.CTk):
         self.scrollable_chat._parent_canvas.yview_moveto(1.0)
 
     def copy_to_clipboard(self, text):
+        import pyperclip
         pyperclip.copy(text)
         # Optional: Change button text temporarily to "Copied!"
 
@@ -376,6 +398,7 @@ class StudyApp(ctk.CTk):
             """Opens a HighDPI-compatible window to show the diagram."""
             popup = Toplevel(self)
             popup.title("Diagram Reference")
+            from PIL import Image
             
             # Load the image using PIL
             pil_img = Image.open(img_path)
@@ -438,8 +461,10 @@ class StudyApp(ctk.CTk):
             
     def clear_chat_action(self):
         """Wipes the UI bubbles and the AI's short-term memory."""
-        # Wipe the Python list holding the conversation
-        self.chat_history = [] 
+        # Drop the old chat session and start a fresh one on the next question
+        from session_app import get_session_manager
+        get_session_manager().reset(self.conversation_id)
+        self.conversation_id = str(uuid.uuid4())
         
         # Clear the UI widgets
         for widget in self.scrollable_chat.winfo_children():
@@ -448,5 +473,6 @@ class StudyApp(ctk.CTk):
         self.add_message("Assistant", "Memory cleared. What shall we study now?")
 
 if __name__ == "__main__":
+    mark("Imports done")
     app = StudyApp()
     app.mainloop()
\ No newline at end of file
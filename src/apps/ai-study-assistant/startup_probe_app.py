@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import subprocess
+
+# 1. In-App Startup Marks
+# Set STUDYAPP_STARTUP_PROBE=1 to print how long the GUI takes to reach each milestone.
+PROBE_ENABLED = os.environ.get("STUDYAPP_STARTUP_PROBE") == "1"
+_process_start = time.perf_counter()
+
+def mark(label):
+    if PROBE_ENABLED:
+        elapsed = time.perf_counter() - _process_start
+        print(f"[Startup] {label}: {elapsed * 1000:.0f} ms")
+
+# 2. Per-Module Import Probe
+# Each module is imported in a fresh interpreter with "-X importtime" so the
+# numbers are cold-start costs, not cached re-imports.
+PROBE_MODULES = [
+    "main_app", "customtkinter", "query_app", "loader_app", "shared_utils_app",
+    "chromadb", "google.genai", "fitz", "pytesseract", "pptx", "PIL.Image",
+    "pyperclip", "sentence_transformers",
+]
+
+def _search_paths():
+    here = os.path.dirname(os.path.abspath(__file__))
+    src = os.path.abspath(os.path.join(here, "..", ".."))
+    return [here, os.path.join(src, "core"), os.path.join(src, "vision")]
+
+def measure_import_time(module_name):
+    """Cumulative cold import time in seconds, or None if the module can't be imported."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(_search_paths() + [env.get("PYTHONPATH", "")])
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        capture_output=True, text=True, env=env
+    )
+    if proc.returncode != 0:
+        return None
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    for line in reversed(proc.stderr.splitlines()):
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) == 3 and parts[2].strip() == module_name:
+            return int(parts[1]) / 1_000_000
+    return None
+
+def report(modules=None):
+    results = [(name, measure_import_time(name)) for name in (modules or PROBE_MODULES)]
+    results.sort(key=lambda item: -1 if item[1] is None else item[1], reverse=True)
+    print(f"{'Module':<24}{'Import time':>14}")
+    for name, seconds in results:
+        shown = "not installed" if seconds is None else f"{seconds * 1000:.0f} ms"
+        print(f"{name:<24}{shown:>14}")
+    return results
+
+if __name__ == "__main__":
+    report(sys.argv[1:] or None)
@@ -0,0 +1,256 @@
+import os
+import re
+import json
+import zlib
+import random
+
+# 1. MinHash Settings
+# 64 hash functions split into 16 LSH bands of 4 rows. Bucket collisions are only
+# candidates; a pair counts as a near-duplicate when the estimated Jaccard
+# similarity of their word shingles reaches DUPLICATE_THRESHOLD.
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.8
+DEDUP_DIR_NAME = "dedup"
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = random.Random(1)  # Fixed seed: signatures must stay comparable across runs
+_PERM_A = [_rng.randrange(1, _MERSENNE_PRIME) for _ in range(NUM_PERM)]
+_PERM_B = [_rng.randrange(0, _MERSENNE_PRIME) for _ in range(NUM_PERM)]
+_WORD_RE = re.compile(r"\w+")
+
+def get_shingles(text, k=SHINGLE_SIZE):
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < k:
+        # Very short chunks ("Questions?") compare on the whole word sequence
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+def minhash_signature(text):
+    # numpy ships with chromadb; imported here so query-time code doesn't pay for it
+    import numpy as np
+
+    shingles = get_shingles(text)
+    if not shingles:
+        return None
+    hashes = np.array([zlib.crc32(s.encode("utf-8")) % _MERSENNE_PRIME for s in shingles], dtype=np.uint64)
+    a = np.array(_PERM_A, dtype=np.uint64)[:, None]
+    b = np.array(_PERM_B, dtype=np.uint64)[:, None]
+    # a, b and hashes are all < 2^31, so a * h + b cannot overflow uint64
+    return ((a * hashes[None, :] + b) % _MERSENNE_PRIME).min(axis=1).tolist()
+
+def estimate_similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+# 2. Persistent LSH Index
+# Stored as a JSON Lines log next to the collection:
+#   {"op": "sig", "id", "sig", "meta"}  a canonical chunk (has a vector in Chroma)
+#   {"op": "ref", "id", "meta"}         another citation that reuses that vector
+# New entries are appended; any other change (edited text, handover, delete)
+# rewrites the log on the next commit().
+# Invariant: a canonical chunk's id is also its Chroma row id and its owner's
+# metadata["id"]. Handing a vector to another chunk therefore moves it to that
+# chunk's id (see loader_app.move_vector).
+class DedupIndex:
+    def __init__(self, log_path):
+        self.path = log_path
+        self.signatures = {}
+        self.owners = {}     # canonical id -> metadata of the chunk that owns the vector
+        self.refs = {}       # canonical id -> [metadata of near-duplicate chunks]
+        self.ref_owner = {}  # near-duplicate chunk id -> canonical id it points to
+        self.buckets = {}
+        self._pending = []
+        self._needs_rewrite = False
+        self._replay()
+
+    @classmethod
+    def load(cls, db_path, collection_name):
+        return cls(os.path.join(db_path, DEDUP_DIR_NAME, f"{collection_name}.jsonl"))
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Torn final write; keep everything before it
+                self._apply(record)
+
+    def _apply(self, record):
+        cid = record["id"]
+        if record["op"] == "sig":
+            if cid in self.signatures:
+                return False
+            self.signatures[cid] = record["sig"]
+            self.owners[cid] = record["meta"]
+            self._bucket(cid, record["sig"])
+        elif record["op"] == "ref":
+            ref_id = record["meta"].get("id")
+            if ref_id == cid or ref_id in self.ref_owner:
+                return False
+            self.refs.setdefault(cid, []).append(record["meta"])
+            self.ref_owner[ref_id] = cid
+        return True
+
+    def _band_keys(self, sig):
+        return [(band, tuple(sig[band * LSH_ROWS:(band + 1) * LSH_ROWS])) for band in range(LSH_BANDS)]
+
+    def _bucket(self, cid, sig):
+        for key in self._band_keys(sig):
+            self.buckets.setdefault(key, set()).add(cid)
+
+    def _unbucket(self, cid, sig):
+        for key in self._band_keys(sig):
+            self.buckets.get(key, set()).discard(cid)
+
+    # 3. Lookups & Updates
+    def find_duplicate(self, sig):
+        """Returns the id of the most similar canonical chunk above the threshold, or None."""
+        candidates = set()
+        for key in self._band_keys(sig):
+            candidates |= self.buckets.get(key, set())
+        best_id, best_score = None, DUPLICATE_THRESHOLD
+        for cid in candidates:
+            score = estimate_similarity(sig, self.signatures[cid])
+            if score >= best_score:
+                best_id, best_score = cid, score
+        return best_id
+
+    def reference_meta(self, ref_id):
+        cid = self.ref_owner.get(ref_id)
+        for meta in self.refs.get(cid, []):
+            if meta.get("id") == ref_id:
+                return meta
+        return None
+
+    def add_canonical(self, chunk_id, sig, meta):
+        record = {"op": "sig", "id": chunk_id, "sig": sig, "meta": meta}
+        if self._apply(record):
+            self._pending.append(record)
+
+    def add_reference(self, canonical_id, meta):
+        record = {"op": "ref", "id": canonical_id, "meta": meta}
+        if self._apply(record):
+            self._pending.append(record)
+
+    def update_owner(self, chunk_id, meta):
+        self.owners[chunk_id] = meta
+        self._needs_rewrite = True
+
+    def remove_canonical(self, chunk_id):
+        """Forgets a vector nobody else cites (its text changed or its source was deleted)."""
+        self._unbucket(chunk_id, self.signatures.pop(chunk_id))
+        del self.owners[chunk_id]
+        self._needs_rewrite = True
+
+    def drop_reference(self, ref_id):
+        cid = self.ref_owner.pop(ref_id, None)
+        if cid is None:
+            return
+        remaining = [m for m in self.refs.get(cid, []) if m.get("id") != ref_id]
+        if remaining:
+            self.refs[cid] = remaining
+        else:
+            self.refs.pop(cid, None)
+        self._needs_rewrite = True
+
+    def hand_over(self, chunk_id):
+        """
+        Gives the vector of `chunk_id` to its first remaining reference, which
+        becomes canonical under its own id. Returns the new owner's metadata; the
+        caller must move the Chroma row from chunk_id to that id.
+        """
+        remaining = self.refs.pop(chunk_id)
+        new_owner = remaining.pop(0)
+        new_id = new_owner["id"]
+        del self.ref_owner[new_id]
+
+        sig = self.signatures.pop(chunk_id)
+        self._unbucket(chunk_id, sig)
+        del self.owners[chunk_id]
+        self.signatures[new_id] = sig
+        self.owners[new_id] = new_owner
+        self._bucket(new_id, sig)
+        if remaining:
+            self.refs[new_id] = remaining
+            for meta in remaining:
+                self.ref_owner[meta["id"]] = new_id
+        self._needs_rewrite = True
+        return new_owner
+
+    def commit(self):
+        """Persists changes; call only after the matching Chroma writes succeeded."""
+        if self._needs_rewrite:
+            self._rewrite()
+            return
+        if not self._pending:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in self._pending:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending = []
+
+    def citations(self, chunk_id):
+        """Extra citations for a stored chunk (near-duplicates found in other places)."""
+        return list(self.refs.get(chunk_id, []))
+
+    def reference_sources(self):
+        return {m.get("source") for metas in self.refs.values() for m in metas}
+
+    def remove_source(self, source):
+        """
+        Drops every citation from `source` in memory. Vectors it owns that other
+        chunks still cite are handed over instead of dropped.
+        Returns [(old_id, new_owner_metadata)]; move those Chroma rows, delete
+        the source's rows, then commit().
+        """
+        handovers = []
+        for cid in list(self.signatures):
+            for meta in list(self.refs.get(cid, [])):
+                if meta.get("source") == source:
+                    self.drop_reference(meta["id"])
+            if self.owners[cid].get("source") == source:
+                if self.refs.get(cid):
+                    handovers.append((cid, self.hand_over(cid)))
+                else:
+                    self.remove_canonical(cid)
+        self._needs_rewrite = True
+        return handovers
+
+    def _rewrite(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for cid, sig in self.signatures.items():
+                f.write(json.dumps({"op": "sig", "id": cid, "sig": sig, "meta": self.owners[cid]}) + "\n")
+                for meta in self.refs.get(cid, []):
+                    f.write(json.dumps({"op": "ref", "id": cid, "meta": meta}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._pending = []
+        self._needs_rewrite = False
+
+# 4. Cached Loading (query side)
+_index_cache = {}
+
+def load_dedup_index(db_path, collection_name):
+    """Reuses the parsed index until the log file changes on disk."""
+    index_path = os.path.join(db_path, DEDUP_DIR_NAME, f"{collection_name}.jsonl")
+    try:
+        mtime = os.stat(index_path).st_mtime_ns
+    except OSError:
+        mtime = None
+    cached = _index_cache.get(index_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    index = DedupIndex(index_path)
+    _index_cache[index_path] = (mtime, index)
+    return index
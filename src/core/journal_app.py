@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import hashlib
+
+# 1. Ingestion Journal
+# An append-only JSON Lines file per upload job. Each line is one fsync'd record:
+#   {"type": "job", ...}    the collection and files the job was started for (first line)
+#   {"type": "pages", ...}  OCR/extraction output for a file (never redo OCR)
+#   {"type": "plan", ...}   how many chunks a file produced
+#   {"type": "batch", ...}  a batch that is safely stored in the collection
+# A crashed job is resumed by replaying the journal and skipping committed chunks.
+JOURNAL_DIR_NAME = "ingest_jobs"
+STALE_JOURNAL_DAYS = 7
+
+def get_job_id(collection_name, file_paths):
+    """Same files (path, size, mtime) into the same collection -> same job."""
+    fingerprint = [collection_name]
+    for path in file_paths:
+        try:
+            st = os.stat(path)
+            fingerprint.append([os.path.abspath(path), st.st_size, st.st_mtime_ns])
+        except OSError:
+            fingerprint.append([os.path.abspath(path), None, None])
+    return hashlib.sha1(json.dumps(fingerprint).encode("utf-8")).hexdigest()[:16]
+
+class IngestJournal:
+    def __init__(self, journal_path, job=None):
+        self.path = journal_path
+        self.job = job
+        self.pages = {}
+        self.plans = {}
+        self.committed_chunks = 0
+        self.committed_batches = 0
+        self._replay()
+
+    @classmethod
+    def open(cls, db_path, collection_name, file_paths):
+        journal_dir = os.path.join(db_path, JOURNAL_DIR_NAME)
+        os.makedirs(journal_dir, exist_ok=True)
+        job_id = get_job_id(collection_name, file_paths)
+        job = {"type": "job", "collection": collection_name, "files": [os.path.abspath(p) for p in file_paths]}
+        return cls(os.path.join(journal_dir, f"{job_id}.jsonl"), job)
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Torn final write from a crash; everything before it is valid
+                kind = record.get("type")
+                if kind == "pages":
+                    self.pages[record["file"]] = [tuple(p) for p in record["pages"]]
+                elif kind == "plan":
+                    self.plans[record["file"]] = record["chunks"]
+                elif kind == "batch":
+                    self.committed_chunks += len(record["ids"])
+                    self.committed_batches += 1
+
+    def _append(self, record):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            # The job record goes first so stale journals can be recognised later
+            if f.tell() == 0 and self.job:
+                f.write(json.dumps(self.job) + "\n")
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    # 2. Recording Steps
+    def pages_for(self, file_path):
+        return self.pages.get(os.path.abspath(file_path))
+
+    def record_pages(self, file_path, pages):
+        key = os.path.abspath(file_path)
+        self.pages[key] = list(pages)
+        self._append({"type": "pages", "file": key, "pages": self.pages[key]})
+
+    def planned_chunks(self, file_path):
+        return self.plans.get(os.path.abspath(file_path))
+
+    def record_plan(self, file_path, chunk_count):
+        key = os.path.abspath(file_path)
+        if self.plans.get(key) == chunk_count:
+            return
+        self.plans[key] = chunk_count
+        self._append({"type": "plan", "file": key, "chunks": chunk_count})
+
+    def record_batch(self, ids):
+        self._append({"type": "batch", "seq": self.committed_batches, "ids": list(ids)})
+        self.committed_chunks += len(ids)
+        self.committed_batches += 1
+
+    def finish(self):
+        """The job is complete; nothing left to resume. Also clears out stale journals."""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        prune_stale_journals(os.path.dirname(self.path))
+
+# 3. Stale Journal Cleanup
+# Journals are only removed by finish(), so an abandoned upload (or one whose files
+# were since edited, which changes the job id) would keep its OCR text forever.
+def _job_changed(journal_path, job_id):
+    """True when the journal's files no longer map to its job id (edited, moved, deleted)."""
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        try:
+            job = json.loads(f.readline())
+        except json.JSONDecodeError:
+            return False  # No job record to compare with; left to the age limit
+    if not isinstance(job, dict) or job.get("type") != "job":
+        return False
+    return get_job_id(job["collection"], job["files"]) != job_id
+
+def prune_stale_journals(journal_dir, max_age_days=STALE_JOURNAL_DAYS):
+    """Deletes journals that can't be resumed any more or weren't touched in max_age_days."""
+    if not os.path.isdir(journal_dir):
+        return 0
+    removed = 0
+    cutoff = time.time() - max_age_days * 86400
+    for name in os.listdir(journal_dir):
+        if not name.endswith(".jsonl"):
+            continue
+        path = os.path.join(journal_dir, name)
+        try:
+            if os.path.getmtime(path) < cutoff or _job_changed(path, name[:-len(".jsonl")]):
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    if removed:
+        print(f"[Journal] Removed {removed} stale ingest journal(s)")
+    return removed
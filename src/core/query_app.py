@@ -1,11 +1,28 @@
 import os
 import time
 from shared_utils_app import get_gemini_client, get_chroma_collection
+from rerank_app import rerank_chunks
+from dedup_app import load_dedup_index
+from session_app import get_session_manager
 
-def ask_my_notes(user_query, api_key, db_path, model_name, collection_name="university_notes", history=None):
+def format_citation(meta):
+    source = meta.get("source", "Unknown")
+    # Transcripts cite a timestamp and plain-text notes a line range instead of a page
+    if "timestamp" in meta:
+        return f"[SOURCE: {source}, TIME: {meta['timestamp']}]"
+    if "line_start" in meta:
+        return f"[SOURCE: {source}, LINES: {meta['line_start']}-{meta['line_end']}]"
+    return f"[SOURCE: {source}, PAGE/SLIDE: {meta.get('page', '?')}]"
+
+def ask_my_notes(user_query, api_key, db_path, model_name, collection_name="university_notes", history=None,
+                 top_k=5, rerank=False, rerank_candidates=20, rerank_threads=None, rerank_budget=None,
+                 conversation_id="default"):
     """
     Handles chat history and RAG context with strict citation formatting 
     to trigger UI diagram buttons.
+    Each conversation_id keeps one chat session; history only seeds a new one.
+    With rerank=True, over-fetches rerank_candidates chunks and keeps the
+    top_k best according to a local cross-encoder.
     """
     try:
         # 1. Initialize tools
@@ -15,41 +32,42 @@ def ask_my_notes(user_query, api_key, db_path, model_name, collection_name="univ
         # 2. Retrieve relevant chunks (RAG)
         results = collection.query(
             query_texts=[user_query],
-            n_results=5 # Increased slightly for better context
+            n_results=max(rerank_candidates, top_k) if rerank else top_k
         )
         
-        # 3. Combine text with strict Source and Page citations
-        context_parts = []
-        if results['documents']:
-            for doc, meta in zip(results['documents'][0], results['metadatas'][0]):
-                source = meta.get("source", "Unknown")
-                page = meta.get("page", "?")
-                # Format each chunk clearly for the AI
-                context_parts.append(f"[SOURCE: {source}, PAGE/SLIDE: {page}]\n{doc}")
-        
-        relevant_context = "\n\n---\n\n".join(context_parts) if context_parts else "No relevant notes found."
-        
-        # 4. Construct System Instruction with Strict Citation Rule
-        system_instruction = (
-            "You are an expert academic tutor for a BSAI student. "
-            "Use the provided lecture notes to answer the question. "
-            "STRICT CITATION RULE: When you use information from the notes, you MUST include the citation "
-            "in this exact format at the end of the relevant sentence: [SOURCE: filename, PAGE/SLIDE: number]. "
-            "This format is required to trigger the student's diagram viewer. "
-            "If you find OCR content labeled [Diagram Content], describe it to the student.\n\n"
-            f"LECTURE NOTES CONTEXT:\n{relevant_context}"
-        )
+        docs = results['documents'][0] if results['documents'] else []
+        metas = results['metadatas'][0] if results['metadatas'] else []
+        ids = results['ids'][0] if results['ids'] else []
+
+        # 2b. Optional cross-encoder rerank (timed separately from retrieval)
+        if rerank and docs:
+            ids, docs, metas, stats = rerank_chunks(
+                user_query, ids, docs, metas, top_k=top_k,
+                num_threads=rerank_threads, latency_budget=rerank_budget
+            )
+            if stats["fallback"]:
+                print(f"[Rerank] Using vector order ({stats['fallback']})")
+            else:
+                print(f"[Rerank] {stats['scored']} scored, {stats['cached']} cached in "
+                      f"{stats['rerank_time']:.3f}s (model load {stats['load_time']:.3f}s)")
+
+        # 3. Pair each chunk with its strict Source and Page citations
+        chunks = []
+        if docs:
+            dedup_index = load_dedup_index(db_path, collection_name)
+            for chunk_id, doc, meta in zip(ids, docs, metas):
+                # List every place a near-duplicate of this chunk appeared
+                citations = [format_citation(meta)] + [format_citation(m) for m in dedup_index.citations(chunk_id)]
+                chunks.append((chunk_id, " ".join(citations), doc))
+
+        # 4. Reuse this conversation's chat session (it keeps earlier turns as citation stubs)
+        session = get_session_manager().get(client, api_key, conversation_id, model_name, history)
 
         # 5. Chat Session Loop
         while True:
             try:
-                chat_session = client.chats.create(
-                    model=model_name,
-                    config={"system_instruction": system_instruction},
-                    history=history if history else []
-                )
-                
-                response = chat_session.send_message(user_query)
+                # The notes go out with this question only
+                response = session.send(user_query, chunks)
                 return response.text
                 
             except Exception as e:
@@ -0,0 +1,142 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# 1. Reranker Settings
+# A small MS-MARCO cross-encoder runs comfortably on a laptop CPU.
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+SCORE_CACHE_SIZE = 5000
+
+_models = {}
+_score_cache = OrderedDict()
+_seconds_per_pair = {}  # Running latency estimate per model (used by the budget check)
+_load_lock = threading.Lock()
+_warming = set()
+_load_errors = {}  # Models that failed to load this session (missing package, offline download...)
+
+# 2. Lazy Model Loading
+# sentence-transformers (and torch) are only imported the first time reranking is used.
+def get_cross_encoder(model_name=DEFAULT_RERANK_MODEL, num_threads=None):
+    if num_threads:
+        import torch
+        torch.set_num_threads(int(num_threads))
+
+    with _load_lock:
+        # Don't retry a load that already failed; it would fail the same way
+        if model_name in _load_errors:
+            raise RuntimeError(_load_errors[model_name])
+        if model_name not in _models:
+            try:
+                from sentence_transformers import CrossEncoder
+                _models[model_name] = CrossEncoder(model_name, device="cpu")
+            except Exception as e:
+                _load_errors[model_name] = str(e)
+                raise
+    return _models[model_name]
+
+def _record_latency(model_name, elapsed, num_pairs):
+    # Exponential moving average keeps the estimate stable across queries
+    per_pair = elapsed / num_pairs
+    estimate = _seconds_per_pair.get(model_name)
+    _seconds_per_pair[model_name] = per_pair if estimate is None else 0.7 * estimate + 0.3 * per_pair
+
+def _warmup_task(model_name, num_threads):
+    try:
+        model = get_cross_encoder(model_name, num_threads)
+        # A small dummy batch seeds the latency estimate for the budget check
+        pairs = [("warm-up query", "warm-up passage " * 50)] * 8
+        start = time.perf_counter()
+        model.predict(pairs, show_progress_bar=False)
+        _record_latency(model_name, time.perf_counter() - start, len(pairs))
+    except Exception as e:
+        print(f"[Rerank] Warm-up failed: {e}")
+    finally:
+        _warming.discard(model_name)
+
+def warm_cross_encoder(model_name=DEFAULT_RERANK_MODEL, num_threads=None):
+    """Loads the model and measures its speed on a background thread (no-op if already done or failed)."""
+    if model_name in _seconds_per_pair or model_name in _warming or model_name in _load_errors:
+        return
+    _warming.add(model_name)
+    threading.Thread(target=_warmup_task, args=(model_name, num_threads), daemon=True).start()
+
+def query_hash(query):
+    normalized = " ".join(query.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+def _cache_get(key):
+    if key in _score_cache:
+        _score_cache.move_to_end(key)
+        return _score_cache[key]
+    return None
+
+def _cache_put(key, score):
+    _score_cache[key] = score
+    _score_cache.move_to_end(key)
+    while len(_score_cache) > SCORE_CACHE_SIZE:
+        _score_cache.popitem(last=False)
+
+def clear_score_cache():
+    _score_cache.clear()
+
+# 3. Rerank Stage
+# Scores (query, chunk) pairs in one batched forward pass and keeps the best top_k.
+def rerank_chunks(query, ids, docs, metas, top_k=5, model_name=DEFAULT_RERANK_MODEL,
+                  num_threads=None, latency_budget=None, batch_size=32):
+    """
+    Returns (ids, docs, metas, stats). Falls back to the original vector order
+    when the estimated scoring time would exceed latency_budget (seconds).
+    """
+    stats = {"candidates": len(ids), "cached": 0, "scored": 0,
+             "load_time": 0.0, "rerank_time": 0.0, "fallback": None}
+
+    if not ids:
+        return ids, docs, metas, stats
+
+    q_hash = query_hash(query)
+    scores = [_cache_get((q_hash, chunk_id)) for chunk_id in ids]
+    missing = [i for i, s in enumerate(scores) if s is None]
+    stats["cached"] = len(ids) - len(missing)
+
+    # Skip the model entirely if the estimate says we would blow the budget.
+    # With no estimate yet, loading the model alone could blow it, so warm up in
+    # the background and use vector order for this query.
+    estimate = _seconds_per_pair.get(model_name)
+    if missing and model_name in _load_errors:
+        stats["fallback"] = f"model unavailable: {_load_errors[model_name]}"
+        return ids[:top_k], docs[:top_k], metas[:top_k], stats
+    if missing and latency_budget is not None:
+        if estimate is None or model_name not in _models:
+            warm_cross_encoder(model_name, num_threads)
+            stats["fallback"] = "reranker still warming up"
+            return ids[:top_k], docs[:top_k], metas[:top_k], stats
+        if estimate * len(missing) > latency_budget:
+            stats["fallback"] = f"estimated {estimate * len(missing):.2f}s > budget {latency_budget:.2f}s"
+            return ids[:top_k], docs[:top_k], metas[:top_k], stats
+
+    if missing:
+        load_start = time.perf_counter()
+        try:
+            model = get_cross_encoder(model_name, num_threads)
+        except Exception as e:
+            stats["fallback"] = f"model unavailable: {e}"
+            return ids[:top_k], docs[:top_k], metas[:top_k], stats
+        stats["load_time"] = time.perf_counter() - load_start
+
+        start = time.perf_counter()
+        pairs = [(query, docs[i]) for i in missing]
+        new_scores = model.predict(pairs, batch_size=batch_size, show_progress_bar=False)
+        elapsed = time.perf_counter() - start
+
+        for i, score in zip(missing, new_scores):
+            scores[i] = float(score)
+            _cache_put((q_hash, ids[i]), scores[i])
+
+        _record_latency(model_name, elapsed, len(missing))
+        stats["scored"] = len(missing)
+        stats["rerank_time"] = elapsed
+
+    order = sorted(range(len(ids)), key=lambda i: scores[i], reverse=True)[:top_k]
+    return ([ids[i] for i in order], [docs[i] for i in order],
+            [metas[i] for i in order], stats)
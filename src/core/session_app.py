@@ -0,0 +1,119 @@
+import re
+import threading
+
+# 1. Fixed Tutor Instruction
+# Sent as the system instruction of every request in a conversation. It never
+# contains per-question data, so it and the earlier (stubbed) turns form a request
+# prefix that only ever grows at the end; session_benchmark_app.py measures how
+# many bytes per turn fall outside that shared prefix. Whether Gemini's implicit
+# cache actually reuses it is up to the API and not guaranteed.
+TUTOR_INSTRUCTION = (
+    "You are an expert academic tutor for a BSAI student. "
+    "Use the lecture notes supplied with each question to answer it. "
+    "STRICT CITATION RULE: When you use information from the notes, you MUST include the citation "
+    "in this exact format at the end of the relevant sentence: [SOURCE: filename, PAGE/SLIDE: number]. "
+    "This format is required to trigger the student's diagram viewer. "
+    "For lecture transcripts, cite the timestamp instead: [SOURCE: filename, TIME: hh:mm:ss]. "
+    "For plain-text notes, cite the line range instead: [SOURCE: filename, LINES: start-end]. "
+    "If you find OCR content labeled [Diagram Content], describe it to the student. "
+    "Earlier questions only list the notes they used; the full notes come with the current question."
+)
+
+# 2. Per-Conversation Chat Session
+# Notes are only ever sent with the question they were retrieved for. Each finished
+# turn is kept in the history as a citation stub, the question and the answer, so
+# history grows by a few hundred bytes per turn rather than by the notes. Past
+# MAX_HISTORY_TURNS turns the oldest are dropped in one go, down to HISTORY_TURNS_KEPT,
+# so the prefix only changes on those occasional trims.
+MAX_HISTORY_TURNS = 12
+HISTORY_TURNS_KEPT = 6
+
+CITATION_PATTERN = re.compile(r"\[SOURCE: (.*?), (?:PAGE/SLIDE|TIME|LINES): (.*?)\]")
+
+def citation_stub(chunks):
+    """'lecture.pdf 3, 7; talk.json 00:01:02' for the citations of a turn's chunks."""
+    locations = {}
+    for _, citation, _ in chunks:
+        for source, where in CITATION_PATTERN.findall(citation):
+            places = locations.setdefault(source, [])
+            if where not in places:
+                places.append(where)
+    return "; ".join(f"{source} {', '.join(places)}" for source, places in locations.items())
+
+class ChatSession:
+    def __init__(self, client, api_key, model_name, seed_history=None):
+        self.client = client
+        self.api_key = api_key
+        self.model_name = model_name
+        self.history = list(seed_history or [])
+        self._lock = threading.Lock()
+        self._trim()
+
+    def switch(self, client, api_key, model_name):
+        """Model or key changed: later turns go to the new model with the same history."""
+        with self._lock:
+            self.client = client
+            self.api_key = api_key
+            self.model_name = model_name
+
+    def build_turn_message(self, user_query, chunks):
+        """chunks: list of (chunk_id, citation, text), all sent in full with this question only."""
+        context = "\n\n---\n\n".join(f"{citation}\n{text}" for _, citation, text in chunks)
+        return f"LECTURE NOTES CONTEXT:\n{context or 'No relevant notes found.'}\n\nQUESTION: {user_query}"
+
+    def build_history_entry(self, user_query, chunks):
+        stub = citation_stub(chunks)
+        return f"NOTES USED: {stub}\n\nQUESTION: {user_query}" if stub else f"QUESTION: {user_query}"
+
+    def send(self, user_query, chunks):
+        # One turn at a time per conversation; two quick questions must not interleave
+        with self._lock:
+            chat = self.client.chats.create(
+                model=self.model_name,
+                config={"system_instruction": TUTOR_INSTRUCTION},
+                history=list(self.history)
+            )
+            response = chat.send_message(self.build_turn_message(user_query, chunks))
+            # Only record the turn once it actually went through
+            self.history.append({"role": "user", "parts": [{"text": self.build_history_entry(user_query, chunks)}]})
+            self.history.append({"role": "model", "parts": [{"text": response.text or ""}]})
+            self._trim()
+            return response
+
+    def _trim(self):
+        if len(self.history) > 2 * MAX_HISTORY_TURNS:
+            self.history = self.history[-2 * HISTORY_TURNS_KEPT:]
+
+# 3. Session Manager
+# One chat session per conversation id, created on first use and reused afterwards.
+class ChatSessionManager:
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, client, api_key, conversation_id, model_name, history=None):
+        """history only seeds a new conversation; an existing session keeps its own turns."""
+        with self._lock:
+            session = self._sessions.get(conversation_id)
+            if session and session.api_key == api_key and session.model_name == model_name:
+                return session
+
+            # The model/key changed: carry the existing turns over
+            if session:
+                session.switch(client, api_key, model_name)
+                return session
+            new_session = ChatSession(client, api_key, model_name, history)
+            self._sessions[conversation_id] = new_session
+            return new_session
+
+    def reset(self, conversation_id=None):
+        with self._lock:
+            if conversation_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(conversation_id, None)
+
+_default_manager = ChatSessionManager()
+
+def get_session_manager():
+    return _default_manager
@@ -0,0 +1,84 @@
+import json
+import random
+from session_app import ChatSessionManager, TUTOR_INSTRUCTION
+
+# 1. Fake Gemini Client
+# Serializes every request the way it would go over the wire and records its
+# size, plus how many bytes differ from the previous request's prefix (the part
+# a prefix cache could not reuse).
+class FakeChat:
+    def __init__(self, recorder, system_instruction, history):
+        self.recorder = recorder
+        self.system_instruction = system_instruction
+        self.history = list(history)
+
+    def send_message(self, message):
+        contents = self.history + [{"role": "user", "parts": [{"text": message}]}]
+        payload = json.dumps({"system_instruction": self.system_instruction, "contents": contents})
+        self.recorder.record(payload.encode("utf-8"))
+        reply = {"role": "model", "parts": [{"text": "Answer [SOURCE: lecture.pdf, PAGE/SLIDE: 1]"}]}
+        self.history = contents + [reply]
+        return type("FakeResponse", (), {"text": reply["parts"][0]["text"]})()
+
+class FakeClient:
+    def __init__(self):
+        self.sent = []
+        self._previous = b""
+        self.chats = self
+
+    def create(self, model, config, history):
+        return FakeChat(self, config["system_instruction"], history)
+
+    def record(self, payload):
+        shared = 0
+        for a, b in zip(payload, self._previous):
+            if a != b:
+                break
+            shared += 1
+        self.sent.append((len(payload), len(payload) - shared))
+        self._previous = payload
+
+# 2. Conversation Replays
+def make_turns(num_turns=30, corpus_size=60, per_turn=5, seed=7):
+    rng = random.Random(seed)
+    corpus = [(f"lecture.pdf_p{i}_0", f"[SOURCE: lecture.pdf, PAGE/SLIDE: {i}]",
+               " ".join(f"term{rng.randrange(500)}" for _ in range(150))) for i in range(1, corpus_size + 1)]
+    return [(f"Question {t + 1} about the lecture?", rng.sample(corpus, per_turn)) for t in range(num_turns)]
+
+def run_legacy(turns):
+    """Previous behaviour: context baked into the system instruction, new chat every turn."""
+    client = FakeClient()
+    history = []
+    for query, chunks in turns:
+        context = "\n\n---\n\n".join(f"{citation}\n{text}" for _, citation, text in chunks)
+        instruction = f"{TUTOR_INSTRUCTION}\n\nLECTURE NOTES CONTEXT:\n{context}"
+        response = client.chats.create(model="fake", config={"system_instruction": instruction}, history=history).send_message(query)
+        history = history + [{"role": "user", "parts": [{"text": query}]},
+                             {"role": "model", "parts": [{"text": response.text}]}]
+    return client.sent
+
+def run_sessions(turns):
+    """Session manager: fixed instruction, notes only in the current turn, stubbed and bounded history."""
+    client = FakeClient()
+    manager = ChatSessionManager()
+    for query, chunks in turns:
+        manager.get(client, "key", "bench", "fake").send(query, chunks)
+    return client.sent
+
+def report(turns=None):
+    turns = turns or make_turns()
+    legacy, sessions = run_legacy(turns), run_sessions(turns)
+    print(f"{'Turn':<6}{'Legacy sent':>13}{'Legacy uncached':>17}{'Session sent':>14}{'Session uncached':>18}")
+    for i, ((l_total, l_new), (s_total, s_new)) in enumerate(zip(legacy, sessions), 1):
+        print(f"{i:<6}{l_total:>13}{l_new:>17}{s_total:>14}{s_new:>18}")
+    print(f"{'Total':<6}{sum(t for t, _ in legacy):>13}{sum(n for _, n in legacy):>17}"
+          f"{sum(t for t, _ in sessions):>14}{sum(n for _, n in sessions):>18}")
+    # Bytes sent per turn must plateau instead of growing with the conversation
+    third = max(1, len(turns) // 3)
+    for name, sent in (("Legacy", legacy), ("Session", sessions)):
+        early, late = max(t for t, _ in sent[:third]), max(t for t, _ in sent[-third:])
+        print(f"{name} peak bytes per turn: first {third} turns {early}, last {third} turns {late}")
+    return legacy, sessions
+
+if __name__ == "__main__":
+    report()
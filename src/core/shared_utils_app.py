@@ -49,4 +49,19 @@ def get_chroma_collection(client, db_path, collection_name):
         embedding_function=gemini_ef
     )
     
-    return collection, chroma_client
\ No newline at end of file
+    return collection, chroma_client
+
+# 4. Read-Only Connection
+# Used for background warm-up: opens an existing collection but never creates
+# a database or collection the user hasn't made yet.
+def open_existing_collection(client, db_path, collection_name):
+    if not os.path.exists(os.path.join(db_path, "chroma.sqlite3")):
+        return None
+    chroma_client = chromadb.PersistentClient(path=db_path)
+    try:
+        return chroma_client.get_collection(
+            name=collection_name,
+            embedding_function=GeminiEmbeddingFunction(client)
+        )
+    except Exception:
+        return None
\ No newline at end of file
@@ -0,0 +1,71 @@
+import os
+import json
+import hashlib
+
+# 1. Local Stub Backend
+# A file-backed stand-in for a Chroma collection, for exercising ingestion
+# without Gemini or ChromaDB (pass it as process_files_to_db(..., collection=...)).
+# Every write replaces the whole state file atomically, so a process killed at
+# any point leaves either the old or the new state on disk.
+# `embed_counts` records how often each ID was embedded, to detect redone work.
+def fake_embedding(text, dims=8):
+    digest = hashlib.sha1(text.encode("utf-8")).digest()
+    return [b / 255 for b in digest[:dims]]
+
+class StubCollection:
+    def __init__(self, state_path):
+        self.path = state_path
+        self.rows = {}
+        self.embed_counts = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.rows = state["rows"]
+            self.embed_counts = state["embed_counts"]
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"rows": self.rows, "embed_counts": self.embed_counts}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _matches(self, row_id, where):
+        meta = self.rows[row_id]["metadata"]
+        return all(meta.get(k) == v for k, v in (where or {}).items())
+
+    # 2. Collection API (the subset the app uses)
+    def upsert(self, ids, documents, metadatas, embeddings=None):
+        if len(set(ids)) != len(ids):
+            raise ValueError(f"Duplicate IDs in one upsert: {len(ids) - len(set(ids))} repeated")
+        for i, row_id in enumerate(ids):
+            if embeddings is None:
+                embedding = fake_embedding(documents[i])
+                self.embed_counts[row_id] = self.embed_counts.get(row_id, 0) + 1
+            else:
+                embedding = list(embeddings[i])
+            self.rows[row_id] = {"document": documents[i], "metadata": dict(metadatas[i]), "embedding": embedding}
+        self._save()
+
+    def update(self, ids, metadatas):
+        for row_id, meta in zip(ids, metadatas):
+            if row_id in self.rows:
+                self.rows[row_id]["metadata"] = dict(meta)
+        self._save()
+
+    def get(self, ids=None, where=None, include=("metadatas", "documents")):
+        found = [r for r in (ids if ids is not None else self.rows) if r in self.rows and self._matches(r, where)]
+        result = {"ids": found}
+        for field, key in (("documents", "document"), ("metadatas", "metadata"), ("embeddings", "embedding")):
+            if field in include:
+                result[field] = [self.rows[r][key] for r in found]
+        return result
+
+    def delete(self, ids=None, where=None):
+        for row_id in self.get(ids=ids, where=where, include=())["ids"]:
+            del self.rows[row_id]
+        self._save()
+
+    def count(self):
+        return len(self.rows)
@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import subprocess
+from types import SimpleNamespace
+
+# Crash/resume check for journaled ingestion.
+# Runs process_files_to_db against the local stub backend in a child process,
+# SIGKILLs it after a random delay, restarts it until it finishes, and then
+# compares the stored rows with an uninterrupted run. Between restarts it checks
+# that nothing already journaled is OCR'd or embedded again.
+#   python ingest_crash_check_app.py [trials]
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "core"))
+
+COLLECTION_NAME = "crash_check"
+STATE_FILE = "stub_collection.json"
+OCR_LOG_FILE = "ocr_calls.log"
+MAX_RUNS_PER_TRIAL = 60
+
+# 1. Sample Upload
+SAMPLE_FILES = ["week1.pdf", "week2.pdf", "lecture_notes.txt", "talk.json"]
+
+def sample_paths(work_dir):
+    return [os.path.join(work_dir, name) for name in SAMPLE_FILES]
+
+def make_samples(work_dir, seed=3):
+    rng = random.Random(seed)
+    words = [f"term{i}" for i in range(2000)]
+    def paragraph(n=170):
+        return " ".join(rng.choice(words) for _ in range(n))
+
+    agenda = "Agenda: recap, new material, lab work, questions. " + paragraph(60)
+    # "Scanned" decks: pages separated by form feeds, read by the fake OCR below
+    for week in (1, 2):
+        path = os.path.join(work_dir, f"week{week}.pdf")
+        pages = [agenda] + [paragraph() for _ in range(5)] + ["Questions?"]
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\f".join(pages))
+
+    path = os.path.join(work_dir, "lecture_notes.txt")
+    with open(path, 'w', encoding='utf-8') as f:
+        for _ in range(40):
+            f.write(paragraph() + "\n")
+
+    path = os.path.join(work_dir, "talk.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([{"text": paragraph(12), "start": i * 4.0, "duration": 4.0} for i in range(300)], f)
+    return sample_paths(work_dir)
+
+# 2. Child Process: one (possibly interrupted) ingestion run
+def run_ingestion(work_dir, db_dir, run_id):
+    import loader_app
+    from stub_backend_app import StubCollection
+
+    ocr_log = os.path.join(db_dir, OCR_LOG_FILE)
+
+    def fake_ocr(path):
+        with open(ocr_log, 'a', encoding='utf-8') as f:
+            f.write(f"{run_id}\t{os.path.abspath(path)}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        time.sleep(0.05)  # OCR is slow; give kills a chance to land here
+        with open(path, 'r', encoding='utf-8') as f:
+            return [(text.strip(), i + 1) for i, text in enumerate(f.read().split("\f")) if text.strip()]
+
+    loader_app.extract_text_with_metadata = fake_ocr
+    loader_app.time = SimpleNamespace(sleep=lambda s: time.sleep(0.01))  # No real rate limit to respect
+
+    # The files must not be rewritten between runs: the job is keyed on their mtimes
+    files = sample_paths(work_dir)
+    collection = StubCollection(os.path.join(db_dir, STATE_FILE))
+    result = loader_app.process_files_to_db(files, None, db_dir, COLLECTION_NAME, collection=collection)
+    print(result)
+    return 0 if result.startswith("Success") else 2
+
+# 3. Parent: kill, restart, verify
+def _spawn(work_dir, db_dir, run_id, kill_after=None):
+    """Returns (killed, returncode, output)."""
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--child", work_dir, db_dir, str(run_id)],
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        output, _ = proc.communicate(timeout=kill_after)
+        return False, proc.returncode, output
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.communicate()
+        return True, None, ""
+
+def _journal_state(db_dir, files):
+    from journal_app import IngestJournal
+    journal = IngestJournal.open(db_dir, COLLECTION_NAME, files)
+    committed = set()
+    if os.path.exists(journal.path):
+        with open(journal.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if record.get("type") == "batch":
+                    committed.update(record["ids"])
+    return committed, set(journal.pages)
+
+def _snapshot(db_dir):
+    from stub_backend_app import StubCollection
+    from dedup_app import DedupIndex
+    stub = StubCollection(os.path.join(db_dir, STATE_FILE))
+    rows = {row_id: (row["document"], row["metadata"]) for row_id, row in stub.rows.items()}
+    index = DedupIndex.load(db_dir, COLLECTION_NAME)
+    return rows, (index.signatures, index.owners, index.refs), stub.embed_counts
+
+def _ocr_calls(db_dir, run_id):
+    path = os.path.join(db_dir, OCR_LOG_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as f:
+        return {line.split("\t", 1)[1].strip() for line in f if line.startswith(f"{run_id}\t")}
+
+def run_check(trials=10, seed=0):
+    rng = random.Random(seed)
+    failures = 0
+    with tempfile.TemporaryDirectory() as root:
+        work_dir = os.path.join(root, "uploads")
+        os.makedirs(work_dir)
+        files = make_samples(work_dir)
+
+        reference_db = os.path.join(root, "reference_db")
+        os.makedirs(reference_db)
+        start = time.perf_counter()
+        killed, code, output = _spawn(work_dir, reference_db, 0)
+        reference_time = time.perf_counter() - start
+        if code != 0:
+            print(f"Reference run failed:\n{output}")
+            return 1
+        reference_rows, reference_index, reference_embeds = _snapshot(reference_db)
+        print(f"Reference: {len(reference_rows)} rows, {sum(reference_embeds.values())} embeddings, {reference_time:.2f}s")
+
+        for trial in range(trials):
+            db_dir = os.path.join(root, f"trial_{trial}")
+            os.makedirs(db_dir)
+            problems, kills = [], 0
+            for run_id in range(MAX_RUNS_PER_TRIAL):
+                committed, ocr_done = _journal_state(db_dir, files)
+                embeds_before = _snapshot(db_dir)[2] if os.path.exists(os.path.join(db_dir, STATE_FILE)) else {}
+
+                killed, code, output = _spawn(work_dir, db_dir, run_id, kill_after=rng.uniform(0, reference_time))
+
+                redone_ocr = _ocr_calls(db_dir, run_id) & ocr_done
+                embeds_after = _snapshot(db_dir)[2] if os.path.exists(os.path.join(db_dir, STATE_FILE)) else {}
+                redone_embeds = {i for i in committed if embeds_after.get(i, 0) > embeds_before.get(i, 0)}
+                if redone_ocr:
+                    problems.append(f"run {run_id} redid OCR for {sorted(redone_ocr)}")
+                if redone_embeds:
+                    problems.append(f"run {run_id} re-embedded {len(redone_embeds)} committed chunks")
+                if killed:
+                    kills += 1
+                    continue
+                if code != 0:
+                    problems.append(f"run {run_id} failed: {output.strip()}")
+                break
+            else:
+                problems.append(f"did not finish within {MAX_RUNS_PER_TRIAL} runs")
+
+            rows, index, embeds = _snapshot(db_dir)
+            if rows != reference_rows:
+                problems.append(f"rows differ from reference ({len(rows)} vs {len(reference_rows)})")
+            if index != reference_index:
+                problems.append("dedup index differs from reference")
+            extra = sum(embeds.values()) - sum(reference_embeds.values())
+
+            status = "OK" if not problems else "FAIL"
+            print(f"Trial {trial + 1}: {status}  kills={kills}  extra embeddings={extra}")
+            for problem in problems:
+                print(f"    {problem}")
+            failures += bool(problems)
+
+    print(f"{trials - failures}/{trials} trials matched the uninterrupted run.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 5 and sys.argv[1] == "--child":
+        sys.exit(run_ingestion(sys.argv[2], sys.argv[3], sys.argv[4]))
+    sys.exit(run_check(int(sys.argv[1]) if len(sys.argv) > 1 else 10))
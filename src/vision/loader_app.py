@@ -1,14 +1,11 @@
 import os
-import uuid
-import pytesseract
 import sys
 import time
 import io
-import fitz  # PyMuPDF
-from PIL import Image as PILImage
-from PIL import ImageOps, ImageFilter
-from pptx import Presentation
-from shared_utils_app import get_gemini_client, get_chroma_collection
+import hashlib
+from stream_loader_app import iter_text_chunks, iter_transcript_chunks, TRANSCRIPT_EXTENSIONS, TranscriptFormatError
+from journal_app import IngestJournal
+from dedup_app import DedupIndex, minhash_signature
 
 # Setup Tesseract
 
@@ -25,24 +22,34 @@ def get_tesseract_path():
     # Join with your specific folder name "Tessereact"
     return os.path.join(base_path, "Tessereact", "tesseract.exe")
 
-# Apply the path to pytesseract
-pytesseract.pytesseract.tesseract_cmd = get_tesseract_path()
-
 # Define path for extracted images (for the "Vision" feature)
 IMAGE_STORE_DIR = "data/images"
-if not os.path.exists(IMAGE_STORE_DIR):
-    os.makedirs(IMAGE_STORE_DIR)
+
+def ensure_image_store():
+    # Created on first extraction rather than at import time
+    if not os.path.exists(IMAGE_STORE_DIR):
+        os.makedirs(IMAGE_STORE_DIR)
 
 def extract_text_with_metadata(file_path):
     """
     Enhanced extraction with Image Pre-processing for better OCR accuracy.
     """
+    # Heavy OCR/imaging libraries load only when an extraction actually runs
+    import pytesseract
+    from PIL import Image as PILImage
+    from PIL import ImageOps
+
+    # Apply the path to pytesseract
+    pytesseract.pytesseract.tesseract_cmd = get_tesseract_path()
+    ensure_image_store()
+
     pages_data = [] 
     base_name = os.path.basename(file_path)
     
     # --- PPTX EXTRACTION ---
     if file_path.endswith('.pptx'):
         try:
+            from pptx import Presentation
             prs = Presentation(file_path)
             for i, slide in enumerate(prs.slides):
                 slide_text = []
@@ -90,6 +97,7 @@ def extract_text_with_metadata(file_path):
     # --- PDF EXTRACTION ---
     elif file_path.endswith('.pdf'):
         try:
+            import fitz  # PyMuPDF
             doc = fitz.open(file_path)
             for i, page in enumerate(doc):
                 text = page.get_text().strip()
@@ -131,12 +139,6 @@ def extract_text_with_metadata(file_path):
                 pages_data.append((text.strip(), 1))
         except Exception: pass
 
-    elif file_path.endswith('.txt'):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            text = f.read()
-            if text.strip():
-                pages_data.append((text.strip(), 1))
-                
     return pages_data
 
 def get_chunks(text, page_num, source_name, chunk_size=1000, overlap=50):
@@ -147,74 +149,222 @@ def get_chunks(text, page_num, source_name, chunk_size=1000, overlap=50):
             "text": chunk_content,
             "metadata": {
                 "source": source_name,
-                "page": page_num,
-                "id": f"{source_name}_p{page_num}_{i}"
+                "page": page_num
             }
         })
     return chunks
 
-def process_files_to_db(file_paths, api_key, db_path, collection_name, progress_callback=None):
-    client = get_gemini_client(api_key)
-    collection, _ = get_chroma_collection(client, db_path, collection_name)
+def _iter_raw_chunks(path, fname, journal):
+    lower = path.lower()
+    if lower.endswith('.txt'):
+        yield from iter_text_chunks(path, fname)
+    elif lower.endswith(TRANSCRIPT_EXTENSIONS):
+        yield from iter_transcript_chunks(path, fname)
+    else:
+        pages = journal.pages_for(path) if journal else None
+        if pages is None:
+            pages = extract_text_with_metadata(path)
+            if journal: journal.record_pages(path, pages)
+        for text, pnum in pages:
+            yield from get_chunks(text, pnum, fname)
+
+def iter_file_chunks(path, journal=None):
+    """
+    Yields chunks for one file. Plain text and transcripts are streamed;
+    PDFs, slides and images go through page extraction + OCR first.
+    Extracted pages are taken from / saved to the job journal when given.
+    Chunk IDs are assigned only here, as "<name>_<path hash>_<n>": stable across
+    re-runs of the same file, and distinct for two different files that share a name.
+    """
+    fname = os.path.basename(path)
+    file_key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:10]
+    for n, chunk in enumerate(_iter_raw_chunks(path, fname, journal)):
+        chunk["metadata"]["id"] = f"{fname}_{file_key}_{n}"
+        yield chunk
+
+def move_vector(collection, old_id, new_owner):
+    """
+    Re-keys a stored vector to its new owner's chunk ID, reusing the embedding.
+    Safe to repeat: if the new row already exists the copy is skipped.
+    """
+    new_id = new_owner["id"]
+    if not collection.get(ids=[new_id], include=[])["ids"]:
+        row = collection.get(ids=[old_id], include=["documents", "embeddings"])
+        if not row["ids"]:
+            return
+        collection.upsert(ids=[new_id], documents=row["documents"], embeddings=row["embeddings"], metadatas=[new_owner])
+    collection.delete(ids=[old_id])
+
+def process_files_to_db(file_paths, api_key, db_path, collection_name, progress_callback=None, collection=None):
+    """
+    Runs the upload as a journaled job. If it stops midway (crash, sleep,
+    non-429 error), calling it again with the same files resumes after the
+    last committed batch without redoing OCR or embedding.
+    """
+    if collection is None:
+        from shared_utils_app import get_gemini_client, get_chroma_collection
+        client = get_gemini_client(api_key)
+        collection, _ = get_chroma_collection(client, db_path, collection_name)
     
-    all_chunks = []
+    journal = IngestJournal.open(db_path, collection_name, file_paths)
+    dedup_index = DedupIndex.load(db_path, collection_name)
+    already_saved = journal.committed_chunks
+    if already_saved and progress_callback:
+        progress_callback(f"Resuming upload: {already_saved} chunks already saved...", 0)
+
     files_processed = 0
-    
-    for i, path in enumerate(file_paths):
-        fname = os.path.basename(path)
-        if progress_callback:
-            progress_callback(f"Analyzing: {fname}...", (i / len(file_paths)) * 0.3)
-        
-        file_data = extract_text_with_metadata(path)
-        if file_data:
-            files_processed += 1
-            for text, pnum in file_data:
-                file_chunks = get_chunks(text, pnum, fname)
-                all_chunks.extend(file_chunks)
+    total_chunks = 0
+    duplicate_chunks = 0
+    chunk_index = 0
+    batch_size = 15 
+    batch_data = []
+    file_errors = []
 
-    if not all_chunks:
-        return "No text could be extracted. Check file content."
+    def flush(progress_percent):
+        nonlocal duplicate_chunks
+        # Near-duplicates (repeated agendas, title slides...) become references
+        # to an existing vector instead of being embedded again
+        new_chunks, meta_updates, moves, stale_ids = [], [], [], []
+        for item in batch_data:
+            meta = item["metadata"]
+            chunk_id = meta["id"]
+            sig = minhash_signature(item["text"])
+            had_vector = False
 
-    batch_size = 15 
-    total_chunks = len(all_chunks)
-    
-    for i in range(0, total_chunks, batch_size):
-        batch_data = all_chunks[i:i + batch_size]
-        docs = [item["text"] for item in batch_data]
-        metas = [item["metadata"] for item in batch_data]
-        ids = [str(uuid.uuid4()) for _ in range(len(batch_data))]
-        
-        progress_percent = 0.3 + ((i / total_chunks) * 0.7)
-        if progress_callback:
-            progress_callback(f"Embedding: {i}/{total_chunks} chunks...", progress_percent)
+            # This chunk already owns a vector (re-upload, or replay after a crash)
+            if chunk_id in dedup_index.signatures:
+                if sig == dedup_index.signatures[chunk_id]:
+                    if dedup_index.owners[chunk_id] != meta:
+                        dedup_index.update_owner(chunk_id, meta)
+                        meta_updates.append(meta)
+                    continue
+                # The text changed: files still citing the old text keep the old vector
+                if dedup_index.refs.get(chunk_id):
+                    moves.append((chunk_id, dedup_index.hand_over(chunk_id)))
+                else:
+                    dedup_index.remove_canonical(chunk_id)
+                    had_vector = True
+
+            canonical_id = dedup_index.find_duplicate(sig) if sig is not None else None
+            previous = dedup_index.ref_owner.get(chunk_id)
+            if previous and (previous != canonical_id or dedup_index.reference_meta(chunk_id) != meta):
+                dedup_index.drop_reference(chunk_id)
+
+            if canonical_id:
+                dedup_index.add_reference(canonical_id, meta)
+                duplicate_chunks += 1
+                if had_vector: stale_ids.append(chunk_id)
+            else:
+                if sig is not None:
+                    dedup_index.add_canonical(chunk_id, sig, meta)
+                new_chunks.append(item)
 
-        success = False
-        while not success:
+        docs = [item["text"] for item in new_chunks]
+        metas = [item["metadata"] for item in new_chunks]
+        # Per-file deterministic IDs + upsert: replaying a batch after a crash can't duplicate it
+        ids = [item["metadata"]["id"] for item in new_chunks]
+
+        while True:
             try:
-                collection.add(documents=docs, ids=ids, metadatas=metas)
-                success = True
+                # Chroma first, then the dedup index, then the journal
+                for old_id, new_owner in moves:
+                    move_vector(collection, old_id, new_owner)
+                if new_chunks:
+                    collection.upsert(documents=docs, ids=ids, metadatas=metas)
+                if meta_updates:
+                    collection.update(ids=[m["id"] for m in meta_updates], metadatas=meta_updates)
+                if stale_ids:
+                    collection.delete(ids=stale_ids)
+                dedup_index.commit()
+                journal.record_batch([item["metadata"]["id"] for item in batch_data])
                 time.sleep(2) 
+                return None
             except Exception as e:
                 if "429" in str(e):
                     if progress_callback: progress_callback("Quota Full. Waiting 60s...", progress_percent)
                     time.sleep(65)
                 else:
-                    return f"Database Error: {e}"
+                    return f"Database Error: {e}. Progress was saved; upload the same files again to resume."
+
+    # Chunks are embedded as soon as a batch fills, so large files never
+    # have to be held in memory all at once.
+    for i, path in enumerate(file_paths):
+        fname = os.path.basename(path)
+        progress_percent = i / len(file_paths)
+
+        # Whole file already committed in a previous run: skip without re-reading it
+        planned = journal.planned_chunks(path)
+        if planned is not None and chunk_index + planned <= already_saved:
+            chunk_index += planned
+            total_chunks += planned
+            if planned: files_processed += 1
+            continue
+
+        if progress_callback:
+            progress_callback(f"Analyzing: {fname}...", progress_percent)
+        
+        file_chunks = 0
+        try:
+            for chunk in iter_file_chunks(path, journal):
+                file_chunks += 1
+                chunk_index += 1
+                if chunk_index <= already_saved:
+                    continue
+                batch_data.append(chunk)
+                if len(batch_data) >= batch_size:
+                    if progress_callback:
+                        progress_callback(f"Embedding: {fname} ({total_chunks + file_chunks} chunks)...", progress_percent)
+                    error = flush(progress_percent)
+                    if error: return error
+                    batch_data = []
+        except TranscriptFormatError as e:
+            # Like the PDF/PPTX readers: report the bad file and carry on with the rest.
+            # Chunks read before the error stay in, so a resumed run still lines up.
+            print(f"Transcript Error: {e}")
+            file_errors.append(f"{fname} ({file_chunks} chunks kept)" if file_chunks else fname)
+
+        journal.record_plan(path, file_chunks)
+        if file_chunks:
+            files_processed += 1
+            total_chunks += file_chunks
+
+    if batch_data:
+        error = flush(1.0)
+        if error: return error
+
+    journal.finish()
+
+    error_note = f" Unreadable transcripts, see the log: {', '.join(file_errors)}." if file_errors else ""
+    if not total_chunks:
+        return f"No text could be extracted. Check file content.{error_note}"
 
-    return f"Success! Added {files_processed} files ({total_chunks} chunks) and saved diagrams. 🚀"
+    dedup_note = ""
+    if duplicate_chunks:
+        dedup_note = f" {duplicate_chunks} near-duplicate chunks reused existing vectors ({duplicate_chunks / total_chunks:.0%} dedup)."
+    return f"Success! Added {files_processed} files ({total_chunks} chunks) and saved diagrams. 🚀{dedup_note}{error_note}"
 
 def get_unique_sources(client, db_path, collection_name="university_notes"):
+    from shared_utils_app import get_chroma_collection
     try:
         collection, _ = get_chroma_collection(client, db_path, collection_name)
         results = collection.get(include=["metadatas"])
         if not results['metadatas']: return []
         sources = {m.get("source") for m in results['metadatas'] if m and "source" in m}
-        return sorted(list(sources))
+        # Sources whose chunks were all near-duplicates only exist as references
+        sources |= DedupIndex.load(db_path, collection_name).reference_sources()
+        return sorted(s for s in sources if s)
     except Exception: return []
 
 def delete_source_from_db(client, db_path, filename, collection_name="university_notes"):
+    from shared_utils_app import get_chroma_collection
     try:
         collection, _ = get_chroma_collection(client, db_path, collection_name)
+        # Vectors still cited by another file's near-duplicates are handed over, not deleted
+        dedup_index = DedupIndex.load(db_path, collection_name)
+        for old_id, new_owner in dedup_index.remove_source(filename):
+            move_vector(collection, old_id, new_owner)
         collection.delete(where={"source": filename})
+        # The index is rewritten only once Chroma has the same state
+        dedup_index.commit()
         return f"Removed {filename} successfully."
     except Exception as e: return f"Delete Error: {e}"
\ No newline at end of file
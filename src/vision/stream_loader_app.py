@@ -0,0 +1,242 @@
+import os
+import re
+import json
+import mmap
+import codecs
+
+# 1. Streaming Plain-Text Loader
+# Memory-maps the file and decodes it block by block, so a multi-hour lecture
+# transcript never has to sit in memory as one string.
+READ_BLOCK_SIZE = 1 << 20  # 1 MB of raw bytes per decode step
+
+def iter_text_chunks(file_path, source_name, chunk_size=1000, overlap=50, read_size=READ_BLOCK_SIZE):
+    """
+    Yields chunk dicts (same shape as get_chunks) while reading the file.
+    Instead of a page, each chunk carries the line range it covers.
+    """
+    step = chunk_size - overlap
+    if os.path.getsize(file_path) == 0:
+        return
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    start = 0          # Index into buffer where the next chunk begins
+    char_offset = 0    # Absolute character offset of buffer[0]
+    line = 1           # Line number at buffer[start]
+
+    def make_chunk(text, line_start, offset):
+        return {
+            "text": text,
+            "metadata": {
+                "source": source_name,
+                "line_start": line_start,
+                "line_end": line_start + text.count("\n"),
+                "char_offset": offset
+            }
+        }
+
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        for pos in range(0, size, read_size):
+            final = pos + read_size >= size
+            # Drop the consumed prefix before appending, keeping the buffer bounded
+            char_offset += start
+            buffer = buffer[start:] + decoder.decode(mm[pos:pos + read_size], final=final)
+            start = 0
+
+            while len(buffer) - start >= chunk_size:
+                text = buffer[start:start + chunk_size]
+                if text.strip():
+                    yield make_chunk(text, line, char_offset + start)
+                line += buffer.count("\n", start, start + step)
+                start += step
+
+        # Tail: only emit if it holds text not already covered by the previous overlap
+        tail = buffer[start:]
+        if tail.strip() and (char_offset + start == 0 or len(tail) > overlap):
+            yield make_chunk(tail, line, char_offset + start)
+
+# 2. Timestamped Transcript Loader (SRT / VTT / JSON)
+# Cues are read one at a time and grouped into chunks tagged with start/end times.
+TRANSCRIPT_EXTENSIONS = ('.srt', '.vtt', '.json', '.jsonl')
+
+TRANSCRIPT_JSON_KEYS = ("transcript", "segments", "captions", "cues")
+MAX_JSON_CUE_SIZE = 1 << 20  # A single cue bigger than this means the file isn't a cue list
+
+class TranscriptFormatError(ValueError):
+    pass
+
+JSON_WHITESPACE = " \t\r\n"
+_TIMING_RE = re.compile(r"((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})\s*-->\s*((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})")
+_TAG_RE = re.compile(r"<[^>]+>")
+
+def parse_timestamp(value):
+    """'01:02:03,500' / '02:03.500' -> seconds as float."""
+    parts = value.replace(",", ".").split(":")
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
+
+def iter_subtitle_cues(file_path):
+    """Yields (start, end, text) from an SRT or WebVTT file, line by line."""
+    with open(file_path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        cue_start, cue_end, cue_lines = None, None, []
+        for raw in f:
+            line = raw.strip()
+            timing = _TIMING_RE.search(line)
+            if timing:
+                cue_start, cue_end = parse_timestamp(timing.group(1)), parse_timestamp(timing.group(2))
+                cue_lines = []
+            elif not line:
+                if cue_start is not None and cue_lines:
+                    yield cue_start, cue_end, " ".join(cue_lines)
+                cue_start, cue_lines = None, []
+            elif cue_start is not None:
+                text = _TAG_RE.sub("", line).strip()
+                if text:
+                    cue_lines.append(text)
+        if cue_start is not None and cue_lines:
+            yield cue_start, cue_end, " ".join(cue_lines)
+
+def _cue_seconds(value, file_name):
+    """Cue times may be numbers of seconds or 'hh:mm:ss(.mmm)' strings."""
+    try:
+        if isinstance(value, str) and ":" in value:
+            return parse_timestamp(value)
+        return float(value)
+    except (TypeError, ValueError):
+        raise TranscriptFormatError(f"{file_name}: invalid cue time {value!r}")
+
+def iter_json_cues(file_path, read_size=64 * 1024):
+    """
+    Yields (start, end, text) from a youtube-transcript-api style JSON array
+    ([{"text", "start", "duration"}, ...]), the same array inside a wrapper
+    object under "transcript" (or "segments"/"captions"/"cues", with any other
+    keys before or after it), or JSON Lines, decoding one cue at a time.
+    Reading stops at the cue array's closing bracket. Any other shape raises
+    TranscriptFormatError.
+    """
+    file_name = os.path.basename(file_path)
+    unsupported = (f"{file_name}: unsupported transcript JSON. Expected a list of cues with "
+                   f"\"text\" and \"start\", JSON Lines, or {{\"transcript\": [...]}}.")
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        buffer, eof = "", False
+
+        def skip(chars):
+            """Drops leading chars, reading on until something else (or EOF) is buffered."""
+            nonlocal buffer, eof
+            buffer = buffer.lstrip(chars)
+            while not buffer and not eof:
+                block = f.read(read_size)
+                eof = not block
+                buffer = block.lstrip(chars)
+
+        def decode_next():
+            nonlocal buffer, eof
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buffer)
+                    # A number or literal running to the end of the buffer may continue in the next block
+                    if end < len(buffer) or eof:
+                        buffer = buffer[end:]
+                        return obj
+                except json.JSONDecodeError:
+                    if eof:
+                        raise TranscriptFormatError(unsupported)
+                if len(buffer) > MAX_JSON_CUE_SIZE:
+                    raise TranscriptFormatError(unsupported)
+                block = f.read(read_size)
+                eof = not block
+                buffer += block
+
+        # 1. Find the cue array: bare, inside a wrapper object, or none (JSON Lines)
+        pending, closing = [], None
+        skip(JSON_WHITESPACE)
+        if buffer.startswith("["):
+            buffer, closing = buffer[1:], "]"
+        elif buffer.startswith("{"):
+            # Walk the object key by key. If it ends without a cue array it was
+            # the first line of a JSON Lines file, rebuilt from the skipped pairs.
+            buffer, first = buffer[1:], {}
+            while True:
+                skip(JSON_WHITESPACE + ",")
+                if buffer.startswith("}"):
+                    buffer = buffer[1:]
+                    pending.append(first)
+                    break
+                key = decode_next()
+                skip(JSON_WHITESPACE)
+                if not isinstance(key, str) or not buffer.startswith(":"):
+                    raise TranscriptFormatError(unsupported)
+                buffer = buffer[1:]
+                skip(JSON_WHITESPACE)
+                if key in TRANSCRIPT_JSON_KEYS and buffer.startswith("["):
+                    buffer, closing = buffer[1:], "]"
+                    break
+                first[key] = decode_next()
+
+        # 2. Stream the cues
+        previous_end = 0.0
+        while True:
+            if pending:
+                obj = pending.pop()
+            else:
+                skip(JSON_WHITESPACE + ",")
+                if not buffer:
+                    if closing:
+                        raise TranscriptFormatError(unsupported)
+                    return
+                if buffer[0] == closing:
+                    return  # Whatever follows the cue array is never read
+                obj = decode_next()
+
+            if not isinstance(obj, dict) or "text" not in obj:
+                raise TranscriptFormatError(unsupported)
+            if not str(obj["text"]).strip():
+                continue
+            # Cues without a start time follow on from the previous one
+            start = _cue_seconds(obj["start"], file_name) if "start" in obj else previous_end
+            if "end" in obj:
+                end_time = _cue_seconds(obj["end"], file_name)
+            else:
+                end_time = start + _cue_seconds(obj.get("duration", 0.0), file_name)
+            previous_end = end_time
+            yield start, end_time, " ".join(str(obj["text"]).split())
+
+def iter_transcript_chunks(file_path, source_name, chunk_size=1000):
+    """Groups transcript cues into ~chunk_size character chunks with start/end times."""
+    if file_path.lower().endswith(('.json', '.jsonl')):
+        cues = iter_json_cues(file_path)
+    else:
+        cues = iter_subtitle_cues(file_path)
+
+    def make_chunk(texts, start, end):
+        return {
+            "text": " ".join(texts),
+            "metadata": {
+                "source": source_name,
+                "start": start,
+                "end": end,
+                "timestamp": format_timestamp(start)
+            }
+        }
+
+    texts, length, chunk_start, chunk_end = [], 0, None, None
+    for start, end, text in cues:
+        if chunk_start is None:
+            chunk_start = start
+        texts.append(text)
+        length += len(text) + 1
+        chunk_end = end
+        if length >= chunk_size:
+            yield make_chunk(texts, chunk_start, chunk_end)
+            texts, length, chunk_start = [], 0, None
+
+    if texts:
+        yield make_chunk(texts, chunk_start, chunk_end)